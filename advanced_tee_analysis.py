@@ -16,6 +16,7 @@ from statsmodels.api import Logit
 import statsmodels.api as sm
 from sklearn.metrics import roc_curve, auc, confusion_matrix, classification_report
 from tabulate import tabulate
+from tee_analysis_cache import ResultCache, fingerprint_dataframe
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -23,6 +24,21 @@ warnings.filterwarnings('ignore')
 plt.style.use('seaborn-v0_8-whitegrid')
 sns.set_palette("Set2")
 
+# Univariate exposures and their display labels
+UNIVARIATE_VARIABLES = {
+    'Age ≥75': 'Age ≥75 years',
+    'Sex': 'Male Sex',
+    'HTN': 'Hypertension',
+    'CHF': 'Congestive Heart Failure',
+    'CVA/TIA': 'Prior CVA/TIA',
+    'DM': 'Diabetes Mellitus',
+    'Vascular Dz': 'Vascular Disease',
+    'SEC': 'Spontaneous Echo Contrast'
+}
+
+# Covariates of the multivariable logistic model
+LOGISTIC_PREDICTORS = ['Age', 'Sex', 'HTN', 'CHF', 'CVA/TIA', 'DM', 'Vascular Dz', 'SEC']
+
 def load_and_clean_data(filepath):
     """Load and prepare the dataset"""
     df = pd.read_excel(filepath, sheet_name=0)
@@ -151,25 +167,39 @@ def create_visualizations(df, output_dir='./tee_analysis_output'):
     print(f"✅ Figure 2 saved: {output_dir}/figure2_stroke_risk.png")
     plt.close()
 
-def calculate_odds_ratios(df):
-    """Calculate odds ratios with confidence intervals"""
-    print("\n" + "="*80)
-    print("📊 ODDS RATIOS AND CONFIDENCE INTERVALS")
-    print("="*80)
-    
-    results = []
-    
-    # Variables to analyze
-    variables = {
-        'Age ≥75': 'Age ≥75 years',
-        'Sex': 'Male Sex',
-        'HTN': 'Hypertension',
-        'CHF': 'Congestive Heart Failure',
-        'CVA/TIA': 'Prior CVA/TIA',
-        'DM': 'Diabetes Mellitus',
-        'Vascular Dz': 'Vascular Disease',
-        'SEC': 'Spontaneous Echo Contrast'
+def _odds_ratio_row(label, clot_pos_exp, clot_pos_noexp, clot_neg_exp, clot_neg_noexp):
+    """Odds ratio, 95% CI and chi-square p-value from 2x2 cell counts"""
+    if not (clot_pos_noexp > 0 and clot_neg_exp > 0):
+        return None
+    
+    # Calculate OR and 95% CI
+    or_value = (clot_pos_exp * clot_neg_noexp) / (clot_pos_noexp * clot_neg_exp)
+    
+    # Standard error and CI
+    se_log_or = np.sqrt(1/clot_pos_exp + 1/clot_pos_noexp + 1/clot_neg_exp + 1/clot_neg_noexp)
+    ci_lower = np.exp(np.log(or_value) - 1.96 * se_log_or)
+    ci_upper = np.exp(np.log(or_value) + 1.96 * se_log_or)
+    
+    # Chi-square test
+    contingency = [[clot_pos_exp, clot_pos_noexp],
+                  [clot_neg_exp, clot_neg_noexp]]
+    chi2, p_value, _, _ = stats.chi2_contingency(contingency)
+    
+    return {
+        'Variable': label,
+        'OR': or_value,
+        'CI_Lower': ci_lower,
+        'CI_Upper': ci_upper,
+        'P_value': p_value,
+        'Clot_Pos_n': clot_pos_exp + clot_pos_noexp,
+        'Clot_Pos_pct': clot_pos_exp / (clot_pos_exp + clot_pos_noexp) * 100,
+        'Clot_Neg_n': clot_neg_exp + clot_neg_noexp,
+        'Clot_Neg_pct': clot_neg_exp / (clot_neg_exp + clot_neg_noexp) * 100
     }
+
+def _univariate_odds_ratios(df, variables):
+    """Compute univariate odds ratios, 95% CIs and chi-square p-values"""
+    results = []
     
     for var, label in variables.items():
         if var not in df.columns:
@@ -181,34 +211,26 @@ def calculate_odds_ratios(df):
         clot_neg_exp = ((df['LAA clot'] == 0) & (df[var] == 1)).sum()
         clot_neg_noexp = ((df['LAA clot'] == 0) & (df[var] == 0)).sum()
         
-        # Calculate OR and 95% CI
-        if clot_pos_noexp > 0 and clot_neg_exp > 0:
-            or_value = (clot_pos_exp * clot_neg_noexp) / (clot_pos_noexp * clot_neg_exp)
-            
-            # Standard error and CI
-            se_log_or = np.sqrt(1/clot_pos_exp + 1/clot_pos_noexp + 1/clot_neg_exp + 1/clot_neg_noexp)
-            ci_lower = np.exp(np.log(or_value) - 1.96 * se_log_or)
-            ci_upper = np.exp(np.log(or_value) + 1.96 * se_log_or)
-            
-            # Chi-square test
-            contingency = [[clot_pos_exp, clot_pos_noexp],
-                          [clot_neg_exp, clot_neg_noexp]]
-            chi2, p_value, _, _ = stats.chi2_contingency(contingency)
-            
-            results.append({
-                'Variable': label,
-                'OR': or_value,
-                'CI_Lower': ci_lower,
-                'CI_Upper': ci_upper,
-                'P_value': p_value,
-                'Clot_Pos_n': clot_pos_exp + clot_pos_noexp,
-                'Clot_Pos_pct': clot_pos_exp / (clot_pos_exp + clot_pos_noexp) * 100,
-                'Clot_Neg_n': clot_neg_exp + clot_neg_noexp,
-                'Clot_Neg_pct': clot_neg_exp / (clot_neg_exp + clot_neg_noexp) * 100
-            })
+        row = _odds_ratio_row(label, clot_pos_exp, clot_pos_noexp, clot_neg_exp, clot_neg_noexp)
+        if row is not None:
+            results.append(row)
+    
+    return pd.DataFrame(results)
+
+def calculate_odds_ratios(df, cache=None):
+    """Calculate odds ratios with confidence intervals"""
+    print("\n" + "="*80)
+    print("📊 ODDS RATIOS AND CONFIDENCE INTERVALS")
+    print("="*80)
+    
+    variables = UNIVARIATE_VARIABLES
     
     # Create table
-    or_df = pd.DataFrame(results)
+    if cache is not None:
+        or_df = cache.get_or_compute('odds_ratios', df, {'variables': variables},
+                                     _univariate_odds_ratios, df, variables)
+    else:
+        or_df = _univariate_odds_ratios(df, variables)
     
     print("\n📋 UNIVARIATE ODDS RATIOS")
     print("-" * 80)
@@ -222,19 +244,14 @@ def calculate_odds_ratios(df):
     
     return or_df
 
-def logistic_regression_analysis(df, output_dir='./tee_analysis_output'):
-    """Perform multivariable logistic regression"""
-    print("\n" + "="*80)
-    print("🔬 MULTIVARIABLE LOGISTIC REGRESSION ANALYSIS")
-    print("="*80)
-    
+def _fit_logistic_model(df, predictors):
+    """Fit the multivariable logistic model and its ROC curve"""
     # Prepare data
-    analysis_df = df[['LAA clot', 'Age', 'Sex', 'HTN', 'CHF', 'CVA/TIA', 
-                      'DM', 'Vascular Dz', 'SEC']].copy()
+    analysis_df = df[['LAA clot'] + predictors].copy()
     analysis_df = analysis_df.dropna()
     
     # Define variables
-    X = analysis_df[['Age', 'Sex', 'HTN', 'CHF', 'CVA/TIA', 'DM', 'Vascular Dz', 'SEC']]
+    X = analysis_df[predictors]
     y = analysis_df['LAA clot']
     
     # Add constant
@@ -244,9 +261,6 @@ def logistic_regression_analysis(df, output_dir='./tee_analysis_output'):
     model = Logit(y, X_const)
     result = model.fit(disp=0)
     
-    print("\n📊 MODEL SUMMARY:")
-    print(result.summary())
-    
     # Extract coefficients and odds ratios
     coef_df = pd.DataFrame({
         'Variable': ['Intercept'] + list(X.columns),
@@ -258,6 +272,31 @@ def logistic_regression_analysis(df, output_dir='./tee_analysis_output'):
         'P_value': result.pvalues.values
     })
     
+    # Predictions for ROC curve
+    y_pred_proba = result.predict(X_const)
+    fpr, tpr, _ = roc_curve(y, y_pred_proba)
+    roc_auc = auc(fpr, tpr)
+    
+    return {'coef_df': coef_df, 'result': result, 'fpr': fpr, 'tpr': tpr, 'roc_auc': roc_auc}
+
+def logistic_regression_analysis(df, output_dir='./tee_analysis_output', cache=None):
+    """Perform multivariable logistic regression"""
+    print("\n" + "="*80)
+    print("🔬 MULTIVARIABLE LOGISTIC REGRESSION ANALYSIS")
+    print("="*80)
+    
+    predictors = LOGISTIC_PREDICTORS
+    if cache is not None:
+        fit = cache.get_or_compute('logistic_regression', df, {'predictors': predictors},
+                                   _fit_logistic_model, df, predictors)
+    else:
+        fit = _fit_logistic_model(df, predictors)
+    coef_df, result = fit['coef_df'], fit['result']
+    fpr, tpr, roc_auc = fit['fpr'], fit['tpr'], fit['roc_auc']
+    
+    print("\n📊 MODEL SUMMARY:")
+    print(result.summary())
+    
     print("\n📋 ADJUSTED ODDS RATIOS:")
     print("-" * 80)
     for _, row in coef_df.iloc[1:].iterrows():
@@ -271,11 +310,6 @@ def logistic_regression_analysis(df, output_dir='./tee_analysis_output'):
     print(f"   BIC: {result.bic:.2f}")
     print(f"   Pseudo R²: {result.prsquared:.3f}")
     
-    # Predictions for ROC curve
-    y_pred_proba = result.predict(X_const)
-    fpr, tpr, _ = roc_curve(y, y_pred_proba)
-    roc_auc = auc(fpr, tpr)
-    
     # Plot ROC curve
     plt.figure(figsize=(8, 6))
     plt.plot(fpr, tpr, color='#fc8d62', lw=2, 
@@ -295,22 +329,10 @@ def logistic_regression_analysis(df, output_dir='./tee_analysis_output'):
     
     return coef_df, result
 
-def generate_publication_table(df, or_df, lr_coef_df, output_dir='./tee_analysis_output'):
-    """Generate publication-ready tables"""
-    print("\n" + "="*80)
-    print("📋 GENERATING PUBLICATION-READY TABLES")
-    print("="*80)
-    
-    # Table 1: Baseline Characteristics
-    print("\n📊 TABLE 1: Baseline Characteristics and Univariate Analysis")
-    print("-" * 100)
-    
+def _build_table1_rows(df, or_df):
+    """Build the rows of Table 1 (baseline characteristics)"""
     table1_data = []
     
-    # Header
-    headers = ['Characteristic', 'LAA Clot (+)\nn=85', 'LAA Clot (-)\nn=436', 
-               'OR (95% CI)', 'P-value']
-    
     # Age
     age_pos = df[df['LAA clot'] == 1]['Age'].dropna()
     age_neg = df[df['LAA clot'] == 0]['Age'].dropna()
@@ -389,6 +411,32 @@ def generate_publication_table(df, or_df, lr_coef_df, output_dir='./tee_analysis
         f'{p_chadsvasc:.3f}'
     ])
     
+    return table1_data
+
+def generate_publication_table(df, or_df, lr_coef_df, output_dir='./tee_analysis_output', cache=None):
+    """Generate publication-ready tables"""
+    print("\n" + "="*80)
+    print("📋 GENERATING PUBLICATION-READY TABLES")
+    print("="*80)
+    
+    # Table 1: Baseline Characteristics
+    print("\n📊 TABLE 1: Baseline Characteristics and Univariate Analysis")
+    print("-" * 100)
+    
+    # Header
+    headers = ['Characteristic', 'LAA Clot (+)\nn=85', 'LAA Clot (-)\nn=436', 
+               'OR (95% CI)', 'P-value']
+    
+    if cache is not None:
+        table1_data = cache.get_or_compute('table1', df, {'or_df': fingerprint_dataframe(or_df)},
+                                           _build_table1_rows, df, or_df)
+    else:
+        table1_data = _build_table1_rows(df, or_df)
+    
+    _write_publication_tables(table1_data, headers, lr_coef_df, output_dir)
+
+def _write_publication_tables(table1_data, headers, lr_coef_df, output_dir):
+    """Print and save Table 1 rows and the Table 2 regression summary"""
     print(tabulate(table1_data, headers=headers, tablefmt='grid'))
     
     # Save to file
@@ -441,17 +489,22 @@ def main():
     df = load_and_clean_data(filepath)
     print(f"\n✅ Loaded {len(df)} records")
     
+    # Stage outputs are reused across runs when data, parameters and code are unchanged
+    cache = ResultCache(f'{output_dir}/.stage_cache')
+    
     # 1. Create Visualizations
     create_visualizations(df, output_dir)
     
     # 2. Calculate Odds Ratios
-    or_df = calculate_odds_ratios(df)
+    or_df = calculate_odds_ratios(df, cache)
     
     # 3. Logistic Regression
-    lr_coef_df, lr_result = logistic_regression_analysis(df, output_dir)
+    lr_coef_df, lr_result = logistic_regression_analysis(df, output_dir, cache)
     
     # 4. Generate Publication Tables
-    generate_publication_table(df, or_df, lr_coef_df, output_dir)
+    generate_publication_table(df, or_df, lr_coef_df, output_dir, cache)
+    
+    print(f"\n💾 Stage cache: {cache.hits} hits, {cache.misses} misses")
     
     print("\n" + "="*80)
     print("✅ ANALYSIS COMPLETE!")
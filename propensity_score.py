@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Propensity-Score Analysis for TEE and LAA Comparisons
+- Propensity score estimated with the logistic model's covariates
+- Greedy 1:1 caliper nearest-neighbour matching on a sorted score index
+- IPW (ATE / ATT) and overlap weights
+- Standardized mean difference balance diagnostics
+"""
+
+import pandas as pd
+import numpy as np
+from scipy import stats
+import statsmodels.api as sm
+from statsmodels.api import Logit
+from tabulate import tabulate
+from advanced_tee_analysis import (load_and_clean_data, LOGISTIC_PREDICTORS,
+                                   UNIVARIATE_VARIABLES, _odds_ratio_row)
+import warnings
+warnings.filterwarnings('ignore')
+
+
+def fit_propensity_score(df, treatment, covariates):
+    """Estimate P(treatment = 1 | covariates) with a logistic model"""
+    analysis_df = df[[treatment] + covariates].dropna()
+    X_const = sm.add_constant(analysis_df[covariates])
+    result = Logit(analysis_df[treatment], X_const).fit(disp=0)
+    return pd.Series(result.predict(X_const), index=analysis_df.index, name='PS'), result
+
+
+def _find(parent, i):
+    """Union-find lookup with path halving"""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def match_nearest_neighbor(ps, treatment, caliper=0.2, replace=False, seed=0):
+    """Greedy 1:1 nearest-neighbour matching on the logit of the propensity score
+
+    Controls are sorted once; each treated patient's nearest controls are found
+    by binary search. Without replacement, used controls are skipped through two
+    union-find "next available" pointers (left and right), so the whole match is
+    O((n_t + n_c) log n_c) rather than an O(n_t · n_c) distance search.
+
+    The caliper is expressed in standard deviations of the logit score.
+    Returns arrays of matched (treated, control) positional indices.
+    """
+    ps = np.clip(np.asarray(ps, dtype=float), 1e-12, 1 - 1e-12)
+    treatment = np.asarray(treatment)
+    score = np.log(ps / (1 - ps))
+    max_dist = caliper * score.std(ddof=1) if caliper is not None else np.inf
+
+    treated_idx = np.flatnonzero(treatment == 1)
+    control_idx = np.flatnonzero(treatment == 0)
+    order = np.argsort(score[control_idx], kind='mergesort')
+    control_idx = control_idx[order]
+    control_score = score[control_idx]
+    m = len(control_idx)
+
+    if replace:
+        t_score = score[treated_idx]
+        pos = np.searchsorted(control_score, t_score)
+        right = np.minimum(pos, m - 1)
+        left = np.maximum(pos - 1, 0)
+        d_right = np.abs(control_score[right] - t_score)
+        d_left = np.abs(t_score - control_score[left])
+        best = np.where(d_left <= d_right, left, right)
+        dist = np.minimum(d_left, d_right)
+        keep = dist <= max_dist
+        return treated_idx[keep], control_idx[best[keep]]
+
+    # right_parent[i]: next unused control at or after i (m = none)
+    # left_parent[i + 1]: next unused control at or before i (0 = none)
+    right_parent = list(range(m + 1))
+    left_parent = list(range(m + 1))
+
+    rng = np.random.default_rng(seed)
+    treated_order = rng.permutation(treated_idx)
+    positions = np.searchsorted(control_score, score[treated_order]).tolist()
+    t_scores = score[treated_order].tolist()
+    c_scores = control_score.tolist()
+
+    matched_t = []
+    matched_c = []
+    for t, pos, s in zip(treated_order.tolist(), positions, t_scores):
+        r = _find(right_parent, pos)
+        l = _find(left_parent, pos) - 1
+        d_r = c_scores[r] - s if r < m else np.inf
+        d_l = s - c_scores[l] if l >= 0 else np.inf
+        if d_l <= d_r:
+            j, d = l, d_l
+        else:
+            j, d = r, d_r
+        if d > max_dist:
+            continue
+        matched_t.append(t)
+        matched_c.append(j)
+        right_parent[j] = j + 1
+        left_parent[j + 1] = j
+
+    matched_t = np.asarray(matched_t, dtype=int)
+    matched_c = control_idx[np.asarray(matched_c, dtype=int)]
+    return matched_t, matched_c
+
+
+def propensity_weights(ps, treatment, estimand='ATE'):
+    """Inverse probability (ATE / ATT) or overlap (ATO) weights"""
+    ps = np.asarray(ps, dtype=float)
+    t = np.asarray(treatment, dtype=float)
+    if estimand == 'ATE':
+        return t / ps + (1 - t) / (1 - ps)
+    if estimand == 'ATT':
+        return t + (1 - t) * ps / (1 - ps)
+    if estimand == 'overlap':
+        return t * (1 - ps) + (1 - t) * ps
+    raise ValueError(f"Unknown estimand: {estimand}")
+
+
+def pooled_standard_deviation(X, treatment):
+    """Per-covariate pooled SD, sqrt((var_treated + var_control) / 2)"""
+    X = np.asarray(X, dtype=float)
+    t = np.asarray(treatment) == 1
+    return np.sqrt((X[t].var(axis=0, ddof=1) + X[~t].var(axis=0, ddof=1)) / 2)
+
+
+def standardized_mean_differences(X, treatment, weights=None, pooled_sd=None):
+    """Standardized mean difference of every covariate in one vectorized pass
+
+    By default the denominator is the pooled SD of X itself. Pass the pooled SD
+    of the full unweighted sample as pooled_sd to make matched or weighted SMDs
+    directly comparable with the crude ones.
+    """
+    X = np.asarray(X, dtype=float)
+    t = np.asarray(treatment) == 1
+    w = np.ones(len(X)) if weights is None else np.asarray(weights, dtype=float)
+
+    w1, w0 = w[t], w[~t]
+    mean1 = w1 @ X[t] / w1.sum()
+    mean0 = w0 @ X[~t] / w0.sum()
+    if pooled_sd is None:
+        pooled_sd = pooled_standard_deviation(X, t)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(pooled_sd > 0, (mean1 - mean0) / pooled_sd, 0.0)
+
+
+def unpaired_odds_ratio(df, treatment, outcome='LAA clot'):
+    """Unadjusted OR of the outcome from the 2x2 table (None if not estimable)"""
+    y = df[outcome]
+    x = df[treatment]
+    return _odds_ratio_row(treatment,
+                           ((y == 1) & (x == 1)).sum(), ((y == 1) & (x == 0)).sum(),
+                           ((y == 0) & (x == 1)).sum(), ((y == 0) & (x == 0)).sum())
+
+
+def paired_odds_ratio(df, treated_idx, control_idx, outcome='LAA clot'):
+    """Conditional OR for 1:1 matched pairs from the discordant pairs (McNemar)
+
+    b counts pairs where only the treated patient has the outcome and c pairs
+    where only the control does; OR = b / c with a Wald CI on log(b / c) and an
+    exact McNemar (binomial) p-value. Returns None if b or c is zero.
+    """
+    y_t = df[outcome].to_numpy()[treated_idx]
+    y_c = df[outcome].to_numpy()[control_idx]
+    b = int(((y_t == 1) & (y_c == 0)).sum())
+    c = int(((y_t == 0) & (y_c == 1)).sum())
+    if b == 0 or c == 0:
+        return None
+    or_value = b / c
+    se_log_or = np.sqrt(1 / b + 1 / c)
+    return {
+        'OR': or_value,
+        'CI_Lower': np.exp(np.log(or_value) - 1.96 * se_log_or),
+        'CI_Upper': np.exp(np.log(or_value) + 1.96 * se_log_or),
+        'P_value': stats.binomtest(b, b + c, 0.5).pvalue
+    }
+
+
+def weighted_odds_ratio(df, treatment, weights, outcome='LAA clot'):
+    """Weighted marginal OR of the outcome with robust (sandwich) 95% CI
+
+    Returns None if any cell of the 2x2 table is empty (the fit would separate).
+    """
+    y, x = df[outcome], df[treatment]
+    cells = [((y == a) & (x == b)).sum() for a in (0, 1) for b in (0, 1)]
+    if min(cells) == 0:
+        return None
+    X_const = sm.add_constant(df[[treatment]].astype(float))
+    model = sm.GLM(df[outcome].astype(float), X_const, family=sm.families.Binomial(),
+                   var_weights=weights)
+    result = model.fit(cov_type='HC0')
+    ci = result.conf_int().loc[treatment]
+    return {
+        'OR': np.exp(result.params[treatment]),
+        'CI_Lower': np.exp(ci[0]),
+        'CI_Upper': np.exp(ci[1]),
+        'P_value': result.pvalues[treatment]
+    }
+
+
+def propensity_score_analysis(df, treatment='SEC', outcome='LAA clot', caliper=0.2,
+                              output_dir='./tee_analysis_output'):
+    """Propensity-score matched and weighted comparison of a binary exposure"""
+    print("\n" + "="*80)
+    print(f"⚖️  PROPENSITY SCORE ANALYSIS: {treatment}")
+    print("="*80)
+
+    covariates = [c for c in LOGISTIC_PREDICTORS if c not in (treatment, outcome)]
+    analysis_df = df[[outcome, treatment] + covariates].dropna().reset_index(drop=True)
+    ps, _ = fit_propensity_score(analysis_df, treatment, covariates)
+    analysis_df['PS'] = ps
+
+    t = analysis_df[treatment].to_numpy()
+    X = analysis_df[covariates].to_numpy(dtype=float)
+    print(f"\n   Exposed: {int((t == 1).sum())}, Unexposed: {int((t == 0).sum())}")
+
+    # Matching
+    matched_t, matched_c = match_nearest_neighbor(analysis_df['PS'], t, caliper=caliper)
+    matched_df = analysis_df.iloc[np.r_[matched_t, matched_c]]
+    print(f"   Matched pairs (caliper {caliper} SD of logit PS): {len(matched_t)}")
+
+    # Weights
+    weights = {
+        'IPW (ATE)': propensity_weights(analysis_df['PS'], t, 'ATE'),
+        'Overlap': propensity_weights(analysis_df['PS'], t, 'overlap')
+    }
+
+    # Balance diagnostics, all scaled by the full unweighted sample's pooled SD
+    pooled_sd = pooled_standard_deviation(X, t)
+    balance = pd.DataFrame({
+        'Covariate': covariates,
+        'SMD_Crude': standardized_mean_differences(X, t, pooled_sd=pooled_sd),
+        'SMD_Matched': standardized_mean_differences(
+            matched_df[covariates].to_numpy(dtype=float), matched_df[treatment].to_numpy(),
+            pooled_sd=pooled_sd),
+    })
+    for label, w in weights.items():
+        balance[f'SMD_{label}'] = standardized_mean_differences(X, t, w, pooled_sd=pooled_sd)
+
+    print("\n📋 COVARIATE BALANCE (|SMD| < 0.1 indicates good balance):")
+    print(tabulate(balance.round(3).values.tolist(), headers=list(balance.columns), tablefmt='grid'))
+
+    # Effect estimates
+    label = UNIVARIATE_VARIABLES.get(treatment, treatment)
+    estimates = {
+        'Crude': unpaired_odds_ratio(analysis_df, treatment, outcome),
+        'PS-matched (paired, McNemar)': paired_odds_ratio(analysis_df, matched_t, matched_c, outcome),
+    }
+    for name, w in weights.items():
+        estimates[name] = weighted_odds_ratio(analysis_df, treatment, w, outcome)
+
+    effects = []
+    for name, est in estimates.items():
+        if est is None or not (est['OR'] > 0 and np.isfinite([est['OR'], est['CI_Lower'], est['CI_Upper']]).all()):
+            effects.append([name, np.nan, np.nan, np.nan, np.nan])
+        else:
+            effects.append([name, est['OR'], est['CI_Lower'], est['CI_Upper'], est['P_value']])
+    effects_df = pd.DataFrame(effects, columns=['Method', 'OR', 'CI_Lower', 'CI_Upper', 'P_value'])
+
+    print(f"\n📊 EFFECT OF {label.upper()} ON {outcome.upper()}:")
+    table_data = []
+    for _, row in effects_df.iterrows():
+        if np.isnan(row['OR']):
+            table_data.append([row['Method'], 'not estimable', '—', '—'])
+        else:
+            table_data.append([row['Method'], f'{row["OR"]:.2f}',
+                               f'{row["CI_Lower"]:.2f}–{row["CI_Upper"]:.2f}', f'{row["P_value"]:.3f}'])
+    headers = ['Method', 'OR', '95% CI', 'P-value']
+    print(tabulate(table_data, headers=headers, tablefmt='grid', disable_numparse=True))
+
+    import os
+    os.makedirs(output_dir, exist_ok=True)
+    with open(f'{output_dir}/table4_propensity_score.txt', 'w') as f:
+        f.write(f"TABLE 4: Propensity Score Analysis of {label}\n")
+        f.write("="*80 + "\n\n")
+        f.write(tabulate(table_data, headers=headers, tablefmt='grid', disable_numparse=True))
+        f.write("\n\nCovariate balance (standardized mean differences)\n\n")
+        f.write(tabulate(balance.round(3).values.tolist(), headers=list(balance.columns), tablefmt='grid'))
+    print(f"\n✅ Table 4 saved: {output_dir}/table4_propensity_score.txt")
+
+    return effects_df, balance
+
+
+def main():
+    """Main propensity score pipeline"""
+    filepath = "/home/abdullahalalawi/Downloads/Final Data TEE and LAA canada.xlsx"
+    output_dir = "/home/abdullahalalawi/medical-research-assistant/tee_analysis_output"
+
+    print("\n" + "="*80)
+    print("🔬 TEE AND LAA PROPENSITY SCORE ANALYSIS")
+    print("="*80)
+    print(f"Dataset: {filepath}")
+    print(f"Output Directory: {output_dir}")
+
+    df = load_and_clean_data(filepath)
+    print(f"\n✅ Loaded {len(df)} records")
+
+    propensity_score_analysis(df, 'SEC', output_dir=output_dir)
+
+    print("\n" + "="*80)
+    print("✅ PROPENSITY SCORE ANALYSIS COMPLETE!")
+    print("="*80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Zero-Copy Shared Cohort for Parallel TEE Analyses
+- Copies the cleaned cohort once into a named shared-memory block, column by column
+- Worker processes attach by name and read read-only NumPy views of each column
+- Only a small handle (block name and column layout) is pickled to workers, so
+  memory use stays flat as bootstraps, CV folds or per-site runs fan out
+- Share only the columns the tasks read; category labels of shared text
+  columns travel in the handle
+"""
+
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import pandas as pd
+import numpy as np
+from advanced_tee_analysis import load_and_clean_data, _odds_ratio_row
+
+# Column offsets are aligned so every view starts on a cache-line boundary
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _open_untracked(name):
+    """Attach to an existing block without registering it for cleanup in this process
+
+    Before Python 3.13 every attach registers the block with the resource
+    tracker, which unlinks it when a worker exits and pulls the data out from
+    under the other workers. Only the creating process owns the block.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedCohort:
+    """Columnar cohort stored in one shared-memory block
+
+    Numeric columns keep their dtype; naive datetimes are stored as their
+    int64 ticks; any other column is stored as int32 category codes with the
+    categories kept in the handle.
+    """
+
+    def __init__(self, shm, handle, owner):
+        self._shm = shm
+        self.handle = handle
+        self._owner = owner
+        self.columns = {}
+        for col in handle['columns']:
+            # frombuffer keeps shm.buf exported for as long as the view lives, so
+            # the block cannot be unmapped underneath it
+            view = np.frombuffer(shm.buf, dtype=np.dtype(col['storage']),
+                                 count=handle['nrows'], offset=col['offset'])
+            view.flags.writeable = False
+            if col['kind'] == 'datetime':
+                view = view.view(col['dtype'])
+            self.columns[col['name']] = view
+
+    @classmethod
+    def create(cls, df, name=None, columns=None):
+        """Copy a DataFrame into a new shared-memory block (the only copy made)
+
+        columns limits the block, and the handle sent to every worker, to the
+        columns the tasks actually read; by default every column is shared.
+        """
+        if columns is not None:
+            df = df[list(columns)]
+        layout = []
+        arrays = []
+        offset = 0
+        for col in df.columns:
+            series = df[col]
+            entry = {'name': col, 'dtype': str(series.dtype), 'categories': None}
+            if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+                values = series.to_numpy()
+                entry['kind'] = 'numeric'
+            elif pd.api.types.is_datetime64_dtype(series):
+                values = series.to_numpy().view('int64')
+                entry['kind'] = 'datetime'
+            else:
+                codes, categories = pd.factorize(series)
+                values = codes.astype(np.int32)
+                entry['kind'] = 'categorical'
+                entry['categories'] = categories.tolist()
+            offset = _aligned(offset)
+            entry['storage'] = values.dtype.str
+            entry['offset'] = offset
+            layout.append(entry)
+            arrays.append(values)
+            offset += values.nbytes
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(offset, 1))
+        for entry, values in zip(layout, arrays):
+            np.frombuffer(shm.buf, dtype=values.dtype, count=len(values),
+                          offset=entry['offset'])[:] = values
+
+        handle = {'name': shm.name, 'nrows': len(df), 'columns': layout}
+        return cls(shm, handle, owner=True)
+
+    @classmethod
+    def attach(cls, handle):
+        """Attach to a block created elsewhere; no cohort data is copied"""
+        return cls(_open_untracked(handle['name']), handle, owner=False)
+
+    def __len__(self):
+        return self.handle['nrows']
+
+    def __getitem__(self, column):
+        """Zero-copy, read-only NumPy view of one column"""
+        return self.columns[column]
+
+    def categories(self, column):
+        """Category labels for a column stored as codes (None otherwise)"""
+        return next(c['categories'] for c in self.handle['columns'] if c['name'] == column)
+
+    def to_frame(self, columns=None):
+        """DataFrame over the shared columns (category codes are decoded, which copies them)"""
+        data = {}
+        for col in self.handle['columns']:
+            if columns is not None and col['name'] not in columns:
+                continue
+            view = self.columns[col['name']]
+            if col['kind'] == 'categorical':
+                data[col['name']] = pd.Categorical.from_codes(view, col['categories'])
+            else:
+                data[col['name']] = view
+        return pd.DataFrame(data, copy=False)
+
+    def close(self):
+        """Release this process's mapping; the owner also unlinks the block
+
+        If views from __getitem__ or to_frame() are still alive the mapping
+        cannot be released yet: a ResourceWarning is issued and the memory is
+        unmapped once the last view is garbage-collected. The owner unlinks
+        the name either way, so no new process can attach.
+        Returns True if the mapping was released immediately.
+        """
+        self.columns = {}
+        released = True
+        try:
+            self._shm.close()
+        except BufferError:
+            released = False
+            warnings.warn(f"shared cohort '{self.handle['name']}' still has live views; "
+                          "its mapping is released when they are dropped", ResourceWarning)
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            self._owner = False
+        return released
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Per-worker attachment, set once by the pool initializer
+_WORKER_COHORT = None
+
+
+def _attach_worker(handle):
+    global _WORKER_COHORT
+    _WORKER_COHORT = SharedCohort.attach(handle)
+
+
+def _run_task(func, task):
+    return func(_WORKER_COHORT, task)
+
+
+def parallel_map(func, cohort, tasks, processes=None):
+    """Run func(cohort, task) for every task in worker processes attached to the shared block
+
+    func must be a module-level function so it can be sent to the workers.
+    """
+    with ProcessPoolExecutor(max_workers=processes, initializer=_attach_worker,
+                             initargs=(cohort.handle,)) as pool:
+        return list(pool.map(_run_task, [func] * len(tasks), tasks,
+                             chunksize=max(1, len(tasks) // (4 * (processes or 4)))))
+
+
+def bootstrap_odds_ratio(cohort, task):
+    """One bootstrap replicate of the univariate OR of an exposure for LAA clot"""
+    exposure, seed = task
+    clot = cohort['LAA clot']
+    x = cohort[exposure]
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(cohort), len(cohort))
+    clot, x = clot[idx], x[idx]
+    row = _odds_ratio_row(exposure,
+                          ((clot == 1) & (x == 1)).sum(), ((clot == 1) & (x == 0)).sum(),
+                          ((clot == 0) & (x == 1)).sum(), ((clot == 0) & (x == 0)).sum())
+    return row['OR'] if row is not None else np.nan
+
+
+def main():
+    """Bootstrap the SEC odds ratio across workers sharing one cohort copy"""
+    filepath = "/home/abdullahalalawi/Downloads/Final Data TEE and LAA canada.xlsx"
+    n_boot = 2000
+
+    print("\n" + "="*80)
+    print("🧠 SHARED-MEMORY COHORT: PARALLEL BOOTSTRAP")
+    print("="*80)
+    print(f"Dataset: {filepath}")
+
+    df = load_and_clean_data(filepath)
+    with SharedCohort.create(df, columns=['LAA clot', 'SEC']) as cohort:
+        print(f"\n✅ Shared {len(cohort)} records in block '{cohort.handle['name']}'")
+
+        ors = np.array(parallel_map(bootstrap_odds_ratio, cohort,
+                                    [('SEC', seed) for seed in range(n_boot)]))
+        ors = ors[np.isfinite(ors)]
+        print(f"\n📊 SEC odds ratio, {len(ors)} bootstrap replicates:")
+        print(f"   Median OR: {np.median(ors):.2f}")
+        print(f"   95% percentile CI: {np.percentile(ors, 2.5):.2f}-{np.percentile(ors, 97.5):.2f}")
+
+    print("\n" + "="*80)
+    print("✅ PARALLEL BOOTSTRAP COMPLETE!")
+    print("="*80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Time-to-Event Analysis for TEE and LAA Follow-up Data
+- Kaplan-Meier survival curves with Greenwood confidence bands
+- Log-rank tests (vectorized across groups and strata)
+- Cox proportional hazards with the logistic model's covariates
+
+All kernels sort the cohort once and compute risk sets with cumulative sums,
+so every Newton iteration of the Cox fit is O(n·p²) after an O(n log n) sort.
+"""
+
+import pandas as pd
+import numpy as np
+from scipy import stats
+import matplotlib.pyplot as plt
+from tabulate import tabulate
+from advanced_tee_analysis import load_and_clean_data, LOGISTIC_PREDICTORS
+import warnings
+warnings.filterwarnings('ignore')
+
+# Follow-up columns (time in days from TEE, 1 = event observed, 0 = censored)
+TIME_COL = 'Follow-up (days)'
+EVENT_COL = 'Stroke'
+
+
+def clean_survival_data(df, time_col=TIME_COL, event_col=EVENT_COL):
+    """Convert follow-up columns to numeric and drop rows without usable follow-up"""
+    df = df.copy()
+    df[time_col] = pd.to_numeric(df[time_col], errors='coerce')
+    df[event_col] = pd.to_numeric(df[event_col], errors='coerce')
+    df = df[(df[time_col] >= 0) & df[event_col].isin([0, 1])]
+    return df.reset_index(drop=True)
+
+
+def _sorted_risk_sets(time):
+    """Sort by descending time and locate the end of each tie group
+
+    Returns the sort order and, for every sorted position, the index of the
+    last row sharing its time. With descending order a cumulative sum taken
+    at that index covers exactly the risk set {j : t_j >= t_i}.
+    """
+    order = np.argsort(-time, kind='mergesort')
+    t_sorted = time[order]
+    # Positions where the next time differs close a tie group
+    group_end = np.flatnonzero(np.r_[t_sorted[1:] != t_sorted[:-1], True])
+    group_id = np.repeat(np.arange(len(group_end)), np.diff(np.r_[-1, group_end]))
+    return order, group_end[group_id]
+
+
+def kaplan_meier(time, event):
+    """Kaplan-Meier estimate with Greenwood log-log 95% confidence band"""
+    time = np.asarray(time, dtype=float)
+    event = np.asarray(event, dtype=int)
+    t_sorted = np.sort(time)
+    n = len(t_sorted)
+
+    event_times, deaths = np.unique(time[event == 1], return_counts=True)
+    at_risk = n - np.searchsorted(t_sorted, event_times, side='left')
+
+    hazard = deaths / at_risk
+    survival = np.cumprod(1.0 - hazard)
+
+    # Greenwood variance on the log-log scale
+    with np.errstate(divide='ignore', invalid='ignore'):
+        greenwood = np.cumsum(deaths / (at_risk * (at_risk - deaths)))
+        log_s = np.log(survival)
+        se_loglog = np.sqrt(greenwood) / np.abs(log_s)
+        loglog = np.log(-log_s)
+        ci_lower = np.exp(-np.exp(loglog + 1.96 * se_loglog))
+        ci_upper = np.exp(-np.exp(loglog - 1.96 * se_loglog))
+    ci_lower = np.where(np.isfinite(ci_lower), ci_lower, survival)
+    ci_upper = np.where(np.isfinite(ci_upper), ci_upper, survival)
+
+    return pd.DataFrame({
+        'Time': event_times,
+        'At_Risk': at_risk,
+        'Events': deaths,
+        'Survival': survival,
+        'CI_Lower': ci_lower,
+        'CI_Upper': ci_upper
+    })
+
+
+def logrank_test(time, event, group, strata=None):
+    """(Stratified) log-rank test for any number of groups
+
+    One lexsort orders the cohort by stratum and descending time. Per-group
+    at-risk counts at every (stratum, time) tie group are then differences of
+    cumulative group counts taken from the stratum's first row, and observed
+    events come from a single bincount on a combined (tie group, group) index.
+    Observed-minus-expected and its covariance are summed over all strata at
+    once, so the cost is O(n log n + n·k) whatever the number of strata.
+    """
+    time = np.asarray(time, dtype=float)
+    event = np.asarray(event, dtype=int)
+    levels, g_idx = np.unique(np.asarray(group), return_inverse=True)
+    if strata is None:
+        s_idx = np.zeros(len(time), dtype=int)
+    else:
+        _, s_idx = np.unique(np.asarray(strata), return_inverse=True)
+    k = len(levels)
+    n = len(time)
+
+    order = np.lexsort((-time, s_idx))
+    t, e, g, s = time[order], event[order], g_idx[order], s_idx[order]
+
+    # Tie groups are runs of equal (stratum, time); strata are contiguous blocks
+    new_tie = np.r_[True, (t[1:] != t[:-1]) | (s[1:] != s[:-1])]
+    tie_id = np.cumsum(new_tie) - 1
+    tie_end = np.r_[np.flatnonzero(new_tie)[1:] - 1, n - 1]
+    stratum_start = np.flatnonzero(np.r_[True, s[1:] != s[:-1]])
+
+    # Row r of cum_counts holds per-group counts among the first r sorted rows
+    cum_counts = np.zeros((n + 1, k))
+    np.cumsum(np.eye(k)[g], axis=0, out=cum_counts[1:])
+    n_risk = cum_counts[tie_end + 1] - cum_counts[stratum_start[s[tie_end]]]
+
+    ev = e == 1
+    d_obs = np.bincount(tie_id[ev] * k + g[ev], minlength=len(tie_end) * k).reshape(-1, k)
+
+    # Only tie groups containing an event contribute
+    has_event = d_obs.sum(axis=1) > 0
+    n_risk, d_obs = n_risk[has_event], d_obs[has_event]
+
+    n_tot = n_risk.sum(axis=1)
+    d_tot = d_obs.sum(axis=1)
+    frac = n_risk / n_tot[:, None]
+
+    o_minus_e = (d_obs - d_tot[:, None] * frac).sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tie_factor = np.where(n_tot > 1, d_tot * (n_tot - d_tot) / (n_tot - 1), 0.0)
+    weighted = tie_factor[:, None] * frac
+    variance = np.diag(weighted.sum(axis=0)) - weighted.T @ frac
+
+    # Drop one group: the O - E vector sums to zero
+    chi2 = float(o_minus_e[:-1] @ np.linalg.pinv(variance[:-1, :-1]) @ o_minus_e[:-1])
+    dof = k - 1
+    return {
+        'Chi2': chi2,
+        'DF': dof,
+        'P_value': stats.chi2.sf(chi2, dof),
+        'Groups': levels,
+        'Observed_minus_Expected': o_minus_e
+    }
+
+
+def _cox_partial_likelihood(beta, X, event, risk_end):
+    """Breslow partial log-likelihood, gradient and information matrix
+
+    Inputs must already be sorted by descending time. Risk-set sums S0 and S1
+    are cumulative sums read off at each tie group's last index; the S2 term of
+    the information is collapsed to Xᵀ diag(w·c) X, where c_j accumulates
+    1/S0 over every event whose risk set contains j.
+    """
+    eta = X @ beta
+    shift = eta.max()
+    w = np.exp(eta - shift)
+
+    s0 = np.cumsum(w)[risk_end]
+    s1 = np.cumsum(w[:, None] * X, axis=0)[risk_end]
+
+    ev = event == 1
+    s0_ev = s0[ev]
+    mean_x = s1[ev] / s0_ev[:, None]
+
+    loglik = float(np.sum(eta[ev] - shift - np.log(s0_ev)))
+    gradient = (X[ev] - mean_x).sum(axis=0)
+
+    inv_s0 = np.zeros(len(w))
+    np.add.at(inv_s0, risk_end[ev], 1.0 / s0_ev)
+    c = np.cumsum(inv_s0[::-1])[::-1]
+    information = (X * (w * c)[:, None]).T @ X - mean_x.T @ mean_x
+
+    return loglik, gradient, information
+
+
+def fit_cox_model(df, covariates, time_col=TIME_COL, event_col=EVENT_COL,
+                  max_iter=50, tol=1e-9):
+    """Fit a Cox proportional hazards model by Newton-Raphson (Breslow ties)"""
+    analysis_df = df[[time_col, event_col] + covariates].dropna()
+    time = analysis_df[time_col].to_numpy(dtype=float)
+    event = analysis_df[event_col].to_numpy(dtype=int)
+    X = analysis_df[covariates].to_numpy(dtype=float)
+
+    # Sort once; every iteration reuses the same order and tie structure
+    order, risk_end = _sorted_risk_sets(time)
+    X, event = X[order], event[order]
+
+    # Centering leaves the coefficients unchanged but keeps exp() well scaled
+    X = X - X.mean(axis=0)
+
+    beta = np.zeros(X.shape[1])
+    loglik, gradient, information = _cox_partial_likelihood(beta, X, event, risk_end)
+    loglik_null = loglik
+    converged = False
+
+    for _ in range(max_iter):
+        step = np.linalg.solve(information, gradient)
+        # Step halving guards against overshooting on sparse events
+        for _ in range(20):
+            new_beta = beta + step
+            new_loglik, new_gradient, new_information = _cox_partial_likelihood(
+                new_beta, X, event, risk_end)
+            if new_loglik >= loglik - 1e-12:
+                break
+            step /= 2
+        converged = abs(new_loglik - loglik) < tol
+        beta, loglik, gradient, information = new_beta, new_loglik, new_gradient, new_information
+        if converged:
+            break
+
+    se = np.sqrt(np.diag(np.linalg.inv(information)))
+    z = beta / se
+    lr_stat = 2 * (loglik - loglik_null)
+
+    coef_df = pd.DataFrame({
+        'Variable': covariates,
+        'Coefficient': beta,
+        'Std_Error': se,
+        'HR': np.exp(beta),
+        'CI_Lower': np.exp(beta - 1.96 * se),
+        'CI_Upper': np.exp(beta + 1.96 * se),
+        'P_value': 2 * stats.norm.sf(np.abs(z))
+    })
+    summary = {
+        'n': len(time),
+        'events': int(event.sum()),
+        'loglik': loglik,
+        'loglik_null': loglik_null,
+        'lr_chi2': lr_stat,
+        'lr_p_value': stats.chi2.sf(lr_stat, len(covariates)),
+        'converged': converged
+    }
+    return coef_df, summary
+
+
+def kaplan_meier_analysis(df, group_col='SEC', time_col=TIME_COL, event_col=EVENT_COL,
+                          output_dir='./tee_analysis_output'):
+    """Plot Kaplan-Meier curves by group and report the log-rank test"""
+    import os
+    os.makedirs(output_dir, exist_ok=True)
+
+    print("\n" + "="*80)
+    print(f"📉 KAPLAN-MEIER ANALYSIS BY {group_col}")
+    print("="*80)
+
+    analysis_df = df[[time_col, event_col, group_col]].dropna()
+
+    plt.figure(figsize=(8, 6))
+    colors = ['#66c2a5', '#fc8d62', '#8da0cb', '#e78ac3']
+    for i, (level, sub) in enumerate(analysis_df.groupby(group_col)):
+        km = kaplan_meier(sub[time_col], sub[event_col])
+        color = colors[i % len(colors)]
+        times = np.r_[0, km['Time']]
+        plt.step(times, np.r_[1, km['Survival']], where='post', color=color, lw=2,
+                 label=f'{group_col} = {level:g} (n={len(sub)}, events={int(sub[event_col].sum())})')
+        plt.fill_between(times, np.r_[1, km['CI_Lower']], np.r_[1, km['CI_Upper']],
+                         step='post', color=color, alpha=0.15)
+
+    lr = logrank_test(analysis_df[time_col], analysis_df[event_col], analysis_df[group_col])
+    print(f"\n   Log-rank: χ² = {lr['Chi2']:.2f}, df = {lr['DF']}, p = {lr['P_value']:.4f}")
+
+    plt.xlabel(f'{time_col}', fontweight='bold')
+    plt.ylabel(f'Freedom from {event_col}', fontweight='bold')
+    plt.title(f'Kaplan-Meier Curves by {group_col} (log-rank p = {lr["P_value"]:.3f})',
+              fontweight='bold', fontsize=14)
+    plt.ylim([0.0, 1.05])
+    plt.legend(loc='lower left')
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(f'{output_dir}/figure4_kaplan_meier.png', dpi=300, bbox_inches='tight')
+    print(f"\n✅ Kaplan-Meier curve saved: {output_dir}/figure4_kaplan_meier.png")
+    plt.close()
+
+    return lr
+
+
+def cox_regression_analysis(df, time_col=TIME_COL, event_col=EVENT_COL,
+                            output_dir='./tee_analysis_output'):
+    """Perform multivariable Cox regression with the logistic model's covariates"""
+    print("\n" + "="*80)
+    print("🔬 MULTIVARIABLE COX PROPORTIONAL HAZARDS ANALYSIS")
+    print("="*80)
+
+    coef_df, summary = fit_cox_model(df, LOGISTIC_PREDICTORS, time_col, event_col)
+
+    print(f"\n   Patients: {summary['n']}, Events: {summary['events']}")
+    if not summary['converged']:
+        print("   ⚠️  Newton-Raphson did not converge; estimates may be unreliable")
+
+    table_data = []
+    for _, row in coef_df.iterrows():
+        sig = '***' if row['P_value'] < 0.001 else '**' if row['P_value'] < 0.01 else '*' if row['P_value'] < 0.05 else ''
+        table_data.append([
+            row['Variable'],
+            f'{row["HR"]:.2f}',
+            f'{row["CI_Lower"]:.2f}–{row["CI_Upper"]:.2f}',
+            f'{row["P_value"]:.3f}{sig}'
+        ])
+    headers = ['Variable', 'Adjusted HR', '95% CI', 'P-value']
+    print(tabulate(table_data, headers=headers, tablefmt='grid'))
+
+    print(f"\n📈 MODEL PERFORMANCE:")
+    print(f"   Partial Log-Likelihood: {summary['loglik']:.2f}")
+    print(f"   Likelihood Ratio: χ² = {summary['lr_chi2']:.2f}, p = {summary['lr_p_value']:.4f}")
+
+    with open(f'{output_dir}/table3_cox_regression.txt', 'w') as f:
+        f.write("TABLE 3: Multivariable Cox Proportional Hazards Analysis\n")
+        f.write("="*80 + "\n\n")
+        f.write(f"Patients: {summary['n']}, Events: {summary['events']}\n\n")
+        f.write(tabulate(table_data, headers=headers, tablefmt='grid'))
+        f.write("\n\n")
+        f.write("Significance levels: * p<0.05, ** p<0.01, *** p<0.001\n")
+
+    print(f"\n✅ Table 3 saved: {output_dir}/table3_cox_regression.txt")
+
+    return coef_df, summary
+
+
+def main():
+    """Main survival analysis pipeline"""
+    filepath = "/home/abdullahalalawi/Downloads/Final Data TEE and LAA canada.xlsx"
+    output_dir = "/home/abdullahalalawi/medical-research-assistant/tee_analysis_output"
+
+    print("\n" + "="*80)
+    print("🔬 TEE AND LAA TIME-TO-EVENT ANALYSIS")
+    print("="*80)
+    print(f"Dataset: {filepath}")
+    print(f"Output Directory: {output_dir}")
+
+    df = load_and_clean_data(filepath)
+    missing = [c for c in (TIME_COL, EVENT_COL) if c not in df.columns]
+    if missing:
+        print(f"\n❌ Follow-up columns not found in dataset: {', '.join(missing)}")
+        return
+
+    df = clean_survival_data(df)
+    print(f"\n✅ Loaded {len(df)} records with follow-up")
+
+    # 1. Kaplan-Meier curves and log-rank test
+    kaplan_meier_analysis(df, 'SEC', output_dir=output_dir)
+
+    # 2. Stratified log-rank (SEC, stratified by prior CVA/TIA)
+    strat_df = df[[TIME_COL, EVENT_COL, 'SEC', 'CVA/TIA']].dropna()
+    lr = logrank_test(strat_df[TIME_COL], strat_df[EVENT_COL], strat_df['SEC'],
+                      strata=strat_df['CVA/TIA'])
+    print(f"\n   Stratified log-rank (by CVA/TIA): χ² = {lr['Chi2']:.2f}, p = {lr['P_value']:.4f}")
+
+    # 3. Cox proportional hazards
+    cox_regression_analysis(df, output_dir=output_dir)
+
+    print("\n" + "="*80)
+    print("✅ SURVIVAL ANALYSIS COMPLETE!")
+    print("="*80)
+    print(f"\n📁 All outputs saved to: {output_dir}/")
+    print("\n📊 Generated Files:")
+    print("   • figure4_kaplan_meier.png - Kaplan-Meier curves by SEC")
+    print("   • table3_cox_regression.txt - Adjusted hazard ratios")
+
+
+if __name__ == "__main__":
+    main()
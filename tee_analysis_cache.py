@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Result Cache for TEE Analysis Stages
+- Disk-backed store keyed by data fingerprint, stage parameters and code version
+- LRU eviction bounded by total size on disk
+- Atomic writes and file locking so concurrent runs never see partial entries
+"""
+
+import fcntl
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from importlib import metadata
+
+import pandas as pd
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Libraries whose versions change cached results (and the pickled Logit results)
+VERSIONED_PACKAGES = ['numpy', 'pandas', 'scipy', 'statsmodels', 'scikit-learn']
+
+
+def fingerprint_dataframe(df):
+    """Return a stable SHA-256 fingerprint of a DataFrame's contents and layout"""
+    h = hashlib.sha256()
+    h.update(json.dumps([str(c) for c in df.columns]).encode('utf-8'))
+    h.update(json.dumps([str(t) for t in df.dtypes]).encode('utf-8'))
+    try:
+        row_hashes = pd.util.hash_pandas_object(df, index=True).values
+        h.update(row_hashes.tobytes())
+    except TypeError:
+        # Mixed-type object columns that pandas cannot hash directly
+        h.update(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+    return h.hexdigest()
+
+
+def code_version(func):
+    """Return a hash of the stage's defining module and library versions
+
+    The whole module is hashed, not just the stage function, so edits to any
+    helper it calls (e.g. _odds_ratio_row) also invalidate old entries.
+    """
+    module = sys.modules.get(func.__module__)
+    try:
+        source = inspect.getsource(module)
+    except (OSError, TypeError):
+        source = f'{func.__module__}.{func.__qualname__}'
+
+    versions = []
+    for package in VERSIONED_PACKAGES:
+        try:
+            versions.append(f'{package}=={metadata.version(package)}')
+        except metadata.PackageNotFoundError:
+            versions.append(f'{package}==missing')
+
+    payload = '\n'.join([f'{func.__module__}.{func.__qualname__}', source] + versions)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class ResultCache:
+    """Disk-backed, content-addressed cache for analysis stage outputs"""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock_path = os.path.join(cache_dir, '.lock')
+
+    @contextmanager
+    def _locked(self, exclusive):
+        with open(self._lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def make_key(self, stage, df, params, func):
+        """Combine data fingerprint, stage parameters and code version into a key"""
+        payload = json.dumps({
+            'format': CACHE_FORMAT_VERSION,
+            'stage': stage,
+            'data': fingerprint_dataframe(df),
+            'params': params,
+            'code': code_version(func),
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def get(self, key):
+        """Return (True, value) on a hit or (False, None) on a miss"""
+        path = self._path(key)
+        with self._locked(exclusive=False):
+            try:
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+            except FileNotFoundError:
+                return False, None
+            except Exception:
+                # Truncated or incompatible entry: drop it so the stage is recomputed
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                return False, None
+            # Bump the modification time so eviction treats this entry as recently used
+            try:
+                os.utime(path, None)
+            except FileNotFoundError:
+                pass
+        return True, value
+
+    def put(self, key, value):
+        """Store a value atomically and evict least recently used entries if needed
+
+        Returns False without storing if the entry alone exceeds max_bytes.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            if os.path.getsize(tmp_path) > self.max_bytes:
+                os.remove(tmp_path)
+                return False
+            with self._locked(exclusive=True):
+                os.replace(tmp_path, self._path(key))
+                self._evict(keep=self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return True
+
+    def _evict(self, keep=None):
+        """Delete the oldest entries until the cache fits in max_bytes (lock held)
+
+        The entry at path keep (the one just written) is never evicted.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pkl'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+
+        entries.sort()
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and os.path.join(self.cache_dir, name) == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def get_or_compute(self, stage, df, params, func, *args, **kwargs):
+        """Return the cached output of a stage, computing and storing it on a miss"""
+        key = self.make_key(stage, df, params, func)
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        start = time.perf_counter()
+        value = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        if self.put(key, value):
+            print(f"   💾 Cached stage '{stage}' ({elapsed:.2f}s)")
+        else:
+            print(f"   ⚠️  Stage '{stage}' output exceeds the cache size limit; not cached")
+        return value
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._locked(exclusive=True):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.cache_dir, name))